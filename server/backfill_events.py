@@ -0,0 +1,47 @@
+"""Rebuild the status_events table from the stored report history.
+
+Usage:
+    python backfill_events.py [--db system_data.db]
+"""
+import argparse
+import json
+import sqlite3
+
+from events import init_events_table, record_transitions
+
+
+def backfill(conn: sqlite3.Connection) -> int:
+    """Replace all status events with ones derived from system_data. Returns the event count.
+
+    Reports are replayed in arrival order against the latest report seen so
+    far, exactly as ingest does, so late reports produce no events here either.
+    """
+    init_events_table(conn)
+    conn.execute('DELETE FROM status_events')
+    total = 0
+    latest = None
+    for (raw,) in conn.execute('SELECT data FROM system_data ORDER BY machine_id, id'):
+        current = json.loads(raw)
+        if latest and latest['machine_id'] != current['machine_id']:
+            latest = None
+        total += record_transitions(conn, latest, current)
+        if not latest or current['timestamp'] >= latest['timestamp']:
+            latest = current
+    conn.commit()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default='system_data.db')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        print(f"Recorded {backfill(conn)} status transitions")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
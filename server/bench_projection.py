@@ -0,0 +1,89 @@
+"""Compare payload size and latency of history responses with and without projection.
+
+Usage:
+    python bench_projection.py [--reports 1000]
+"""
+import argparse
+import json
+import sqlite3
+import statistics
+import time
+
+import projection
+
+DASHBOARD_FIELDS = ['timestamp', 'checks.disk_encryption.status', 'checks.os_updates.status',
+                    'checks.antivirus.status', 'checks.sleep_settings.status',
+                    'resource_usage.cpu_percent', 'resource_usage.memory_percent',
+                    'resource_usage.disk_usage_percent']
+
+
+def make_report(i: int) -> dict:
+    apt_output = ''.join(f'Inst package{n} [1.{n}] (1.{n + 1} Ubuntu:22.04/jammy-updates [amd64])\n' for n in range(60))
+    return {
+        'machine_id': 'bench-machine',
+        'timestamp': f'2024-01-01T00:00:{i:06d}',
+        'os': {'system': 'Linux', 'version': '#1 SMP PREEMPT_DYNAMIC', 'release': '6.5.0'},
+        'checks': {
+            'disk_encryption': {'status': 'encrypted', 'details': 'LUKS active, cipher aes-xts-plain64\n' * 8},
+            'os_updates': {'status': 'updates_available', 'details': apt_output},
+            'antivirus': {'status': 'active', 'name': 'ClamAV', 'details': '/usr/bin/clamav\n'},
+            'sleep_settings': {'status': 'ok', 'sleep_time_minutes': 0, 'details': 's2idle [deep]\n'}
+        },
+        'resource_usage': {'cpu_percent': i % 100, 'memory_percent': 42.0, 'disk_usage_percent': 61.5}
+    }
+
+
+def build_db(reports: int) -> sqlite3.Connection:
+    conn = sqlite3.connect(':memory:')
+    conn.execute('''
+        CREATE TABLE system_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            machine_id TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            data TEXT NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX idx_system_data_machine_ts ON system_data (machine_id, timestamp)')
+    projection.init_extracted_columns(conn)
+    conn.executemany(projection.INSERT_REPORT, [projection.report_row(make_report(i)) for i in range(reports)])
+    conn.commit()
+    return conn
+
+
+def measure(conn: sqlite3.Connection, limit: int, runs: int = 15, **kwargs):
+    def once():
+        result = projection.fetch(
+            conn, 'FROM system_data sd WHERE machine_id = ? ORDER BY timestamp DESC LIMIT ?',
+            ['bench-machine', limit], projection.REPORT_FIELDS, lambda data: data, **kwargs
+        )
+        return json.dumps(result, separators=(',', ':'))
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        body = once()
+        timings.append(time.perf_counter() - start)
+    return len(body.encode()), statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reports', type=int, default=1000)
+    args = parser.parse_args()
+
+    conn = build_db(args.reports)
+    cases = [
+        ('full reports', {}),
+        ('fields= (columns)', {'fields': DASHBOARD_FIELDS}),
+        ('fields= + columnar', {'fields': DASHBOARD_FIELDS, 'columnar': True}),
+        ('fields= (JSON parse)', {'fields': DASHBOARD_FIELDS + ['os.system.name']}),
+    ]
+    print(f"/machine/<id>/history, {args.reports} reports")
+    print(f"{'mode':<22}{'bytes':>12}{'ms':>10}")
+    for label, kwargs in cases:
+        size, ms = measure(conn, args.reports, **kwargs)
+        print(f"{label:<22}{size:>12,}{ms:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+import json
+import sqlite3
+from typing import Any, Dict, List, Optional, Tuple
+
+CREATE_STATUS_EVENTS = [
+    '''
+    CREATE TABLE IF NOT EXISTS status_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        machine_id TEXT NOT NULL,
+        check_name TEXT NOT NULL,
+        from_status TEXT,
+        to_status TEXT,
+        timestamp TEXT NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_status_events_check_ts ON status_events (check_name, timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_status_events_machine_ts ON status_events (machine_id, timestamp)'
+]
+
+
+def init_events_table(conn: sqlite3.Connection):
+    """Create the status_events table and its indexes if missing."""
+    for statement in CREATE_STATUS_EVENTS:
+        conn.execute(statement)
+
+
+def _statuses(report: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """Status per check; malformed ``checks`` or check entries count as no status."""
+    checks = report.get('checks')
+    if not isinstance(checks, dict):
+        return {}
+    return {name: check.get('status') if isinstance(check, dict) else None for name, check in checks.items()}
+
+
+def detect_transitions(previous: Optional[Dict[str, Any]], current: Dict[str, Any]) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """Return (check_name, from_status, to_status) for every check whose status changed."""
+    if not previous:
+        return []
+    old_statuses = _statuses(previous)
+    new_statuses = _statuses(current)
+    transitions = []
+    for check_name in sorted(set(old_statuses) | set(new_statuses)):
+        from_status = old_statuses.get(check_name)
+        to_status = new_statuses.get(check_name)
+        if from_status != to_status:
+            transitions.append((check_name, from_status, to_status))
+    return transitions
+
+
+def latest_report(conn: sqlite3.Connection, machine_id: str) -> Optional[Dict[str, Any]]:
+    """Latest stored report for a machine, or None if it has never reported."""
+    row = conn.execute(
+        'SELECT data FROM system_data WHERE machine_id = ? ORDER BY timestamp DESC, id DESC LIMIT 1',
+        (machine_id,)
+    ).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def record_transitions(conn: sqlite3.Connection, previous: Optional[Dict[str, Any]], current: Dict[str, Any]) -> int:
+    """Append status_events rows for changes between two reports. Returns the number recorded."""
+    # Late reports older than the latest state would produce bogus transitions
+    if previous and current['timestamp'] < previous['timestamp']:
+        return 0
+    transitions = detect_transitions(previous, current)
+    conn.executemany(
+        'INSERT INTO status_events (machine_id, check_name, from_status, to_status, timestamp) '
+        'VALUES (?, ?, ?, ?, ?)',
+        [(current['machine_id'], check_name, from_status, to_status, current['timestamp'])
+         for check_name, from_status, to_status in transitions]
+    )
+    return len(transitions)
+
+
+def query_transitions(conn: sqlite3.Connection, check: Optional[str] = None, since: Optional[str] = None,
+                      until: Optional[str] = None, from_status: Optional[str] = None,
+                      to_status: Optional[str] = None, machine_id: Optional[str] = None,
+                      limit: int = 1000) -> List[Dict[str, Any]]:
+    """Filter status_events, newest first."""
+    query = 'SELECT machine_id, check_name, from_status, to_status, timestamp FROM status_events'
+    conditions = []
+    params: List[Any] = []
+    for column, op, value in (('check_name', '=', check), ('timestamp', '>=', since),
+                              ('timestamp', '<=', until), ('from_status', '=', from_status),
+                              ('to_status', '=', to_status), ('machine_id', '=', machine_id)):
+        if value:
+            conditions.append(f'{column} {op} ?')
+            params.append(value)
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += ' ORDER BY timestamp DESC LIMIT ?'
+    params.append(limit)
+    return [
+        {'machine_id': row[0], 'check': row[1], 'from_status': row[2], 'to_status': row[3], 'timestamp': row[4]}
+        for row in conn.execute(query, params)
+    ]
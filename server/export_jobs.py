@@ -0,0 +1,271 @@
+"""Parallel bulk export of stored reports to gzip-compressed files.
+
+An export job splits its time range into shards, encodes each shard on a
+process pool into its own gzip member and concatenates the members in time
+order once all shards are done. Supported formats:
+
+- ``ndjson``: one stored report per line
+- ``columnar``: one ``{"columns": [...], "rows": [[...], ...]}`` block per line,
+  built from the extracted columns without parsing the stored reports
+"""
+import gzip
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from projection import REPORT_FIELDS
+
+FORMATS = ('ndjson', 'columnar')
+
+# Rows per columnar block
+COLUMNAR_BLOCK_ROWS = 5000
+
+
+def _check_timestamp(value: str):
+    """Reject bounds that cannot be compared with the stored naive ISO timestamps."""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid timestamp {value!r}, expected ISO 8601 such as 2024-01-01T00:00:00")
+    if parsed.tzinfo is not None:
+        raise ValueError(f"Timestamp {value!r} has a timezone; stored timestamps are naive local times")
+
+
+def _split_range(start: str, end: str, shards: int) -> List[Tuple[str, str]]:
+    """Split [start, end] into up to ``shards`` contiguous ISO timestamp ranges.
+
+    Falls back to a single shard when the bounds cannot be parsed or compared
+    (e.g. an agent that reported timezone-aware timestamps).
+    """
+    try:
+        first, last = datetime.fromisoformat(start), datetime.fromisoformat(end)
+        if shards <= 1 or last <= first:
+            return [(start, end)]
+    except (TypeError, ValueError):
+        return [(start, end)]
+    step = (last - first) / shards
+    bounds = [start] + [(first + step * i).isoformat() for i in range(1, shards)] + [end]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def export_shard(db_path: str, out_path: str, start: str, end: str, last: bool,
+                 fmt: str, filters: Dict[str, str]) -> int:
+    """Write one shard as a gzip member. Runs in a worker process; returns the row count.
+
+    The range is [start, end), or [start, end] for the last shard.
+    """
+    query = 'FROM system_data WHERE timestamp >= ? AND timestamp {} ?'.format('<=' if last else '<')
+    params: List[Any] = [start, end]
+    if filters.get('machine_id'):
+        query += ' AND machine_id = ?'
+        params.append(filters['machine_id'])
+    # Same case-insensitive match as /export/csv
+    if filters.get('os_system'):
+        query += ' AND LOWER(os_system) = LOWER(?)'
+        params.append(filters['os_system'])
+    query += ' ORDER BY timestamp'
+
+    conn = sqlite3.connect(db_path)
+    count = 0
+    try:
+        with gzip.open(out_path, 'wt', encoding='utf-8') as out:
+            if fmt == 'ndjson':
+                for (raw,) in conn.execute(f'SELECT data {query}', params):
+                    out.write(raw)
+                    out.write('\n')
+                    count += 1
+            else:
+                columns = list(REPORT_FIELDS)
+                cursor = conn.execute(f"SELECT {', '.join(REPORT_FIELDS.values())} {query}", params)
+                while True:
+                    rows = cursor.fetchmany(COLUMNAR_BLOCK_ROWS)
+                    if not rows:
+                        break
+                    out.write(json.dumps({'columns': columns, 'rows': [list(row) for row in rows]}))
+                    out.write('\n')
+                    count += len(rows)
+    finally:
+        conn.close()
+    return count
+
+
+CREATE_EXPORT_JOBS = '''
+    CREATE TABLE IF NOT EXISTS export_jobs (
+        job_id TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        format TEXT NOT NULL,
+        start_date TEXT,
+        end_date TEXT,
+        shards_total INTEGER NOT NULL,
+        shards_done INTEGER NOT NULL DEFAULT 0,
+        rows INTEGER NOT NULL DEFAULT 0,
+        created TEXT NOT NULL,
+        finished TEXT,
+        error TEXT,
+        path TEXT NOT NULL
+    )
+'''
+
+# Finished jobs and their files are deleted after this many hours
+DEFAULT_RETENTION_HOURS = 24
+
+
+def init_export_jobs_table(conn: sqlite3.Connection):
+    """Create the export_jobs table if missing."""
+    conn.execute(CREATE_EXPORT_JOBS)
+
+
+class ExportJobManager:
+    """Runs export jobs on a shared process pool.
+
+    Job state lives in the export_jobs table next to the data, so any server
+    process can report status and serve the file. A job is executed by the
+    process that created it; if that process dies the job stays ``running``.
+    """
+
+    def __init__(self, db_path: str, export_dir: str, workers: Optional[int] = None,
+                 retention_hours: float = DEFAULT_RETENTION_HOURS):
+        self.db_path = db_path
+        self.export_dir = export_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.retention_hours = retention_hours
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        init_export_jobs_table(conn)
+        return conn
+
+    def _update(self, job_id: str, sql: str, params: Sequence[Any]):
+        conn = self._connect()
+        try:
+            conn.execute(f'UPDATE export_jobs SET {sql} WHERE job_id = ?', list(params) + [job_id])
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # Forking a threaded server can copy held locks into the workers
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def _time_bounds(self, start: Optional[str], end: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            low, high = conn.execute('SELECT MIN(timestamp), MAX(timestamp) FROM system_data').fetchone()
+        finally:
+            conn.close()
+        return start or low, end or high
+
+    def cleanup(self) -> int:
+        """Delete finished jobs older than the retention period and their files. Returns the count."""
+        cutoff = (datetime.now() - timedelta(hours=self.retention_hours)).isoformat()
+        conn = self._connect()
+        try:
+            expired = conn.execute(
+                "SELECT job_id, path FROM export_jobs WHERE status != 'running' AND finished < ?", (cutoff,)
+            ).fetchall()
+            for row in expired:
+                if os.path.exists(row['path']):
+                    os.remove(row['path'])
+                conn.execute('DELETE FROM export_jobs WHERE job_id = ?', (row['job_id'],))
+            conn.commit()
+        finally:
+            conn.close()
+        return len(expired)
+
+    def create(self, fmt: str = 'ndjson', start: Optional[str] = None, end: Optional[str] = None,
+               filters: Optional[Dict[str, str]] = None, shards: Optional[int] = None) -> Dict[str, Any]:
+        """Start an export job and return its status. Raises ValueError for bad parameters."""
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format {fmt!r}, expected one of {', '.join(FORMATS)}")
+        for value in (start, end):
+            if value:
+                _check_timestamp(value)
+        self.cleanup()
+        start, end = self._time_bounds(start, end)
+        ranges = _split_range(start, end, shards or self.workers * 4) if start and end else []
+
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.export_dir, exist_ok=True)
+        path = os.path.join(self.export_dir, f'{job_id}.{fmt}.gz')
+        conn = self._connect()
+        try:
+            conn.execute(
+                'INSERT INTO export_jobs (job_id, status, format, start_date, end_date, shards_total, created, path) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, 'running', fmt, start, end, len(ranges), datetime.now().isoformat(), path)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+        threading.Thread(target=self._run, args=(job_id, fmt, path, ranges, filters or {}), daemon=True).start()
+        return self.status(job_id)
+
+    def _run(self, job_id: str, fmt: str, path: str, ranges: List[Tuple[str, str]], filters: Dict[str, str]):
+        parts = [f'{path}.part{i}' for i in range(len(ranges))]
+        try:
+            pool = self._get_pool()
+            futures = {
+                pool.submit(export_shard, self.db_path, part, low, high, i == len(ranges) - 1,
+                            fmt, filters): i
+                for i, (part, (low, high)) in enumerate(zip(parts, ranges))
+            }
+            for future in as_completed(futures):
+                self._update(job_id, 'shards_done = shards_done + 1, rows = rows + ?', [future.result()])
+
+            # Concatenated gzip members form a single valid gzip stream
+            with open(path, 'wb') as out:
+                if not parts:
+                    out.write(gzip.compress(b''))
+                for part in parts:
+                    with open(part, 'rb') as f:
+                        shutil.copyfileobj(f, out)
+            status, error = 'completed', None
+        except Exception as e:
+            logging.error(f"Export job {job_id} failed: {str(e)}")
+            status, error = 'failed', str(e)
+        finally:
+            for part in parts:
+                if os.path.exists(part):
+                    os.remove(part)
+
+        self._update(job_id, 'status = ?, error = ?, finished = ?', [status, error, datetime.now().isoformat()])
+        logging.info(f"Export job {job_id} {status}")
+
+    def _row(self, job_id: str) -> Optional[sqlite3.Row]:
+        conn = self._connect()
+        try:
+            return conn.execute('SELECT * FROM export_jobs WHERE job_id = ?', (job_id,)).fetchone()
+        finally:
+            conn.close()
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Public view of a job, or None if unknown."""
+        row = self._row(job_id)
+        if row is None:
+            return None
+        view = {key: row[key] for key in row.keys() if key != 'path'}
+        view['progress'] = view['shards_done'] / view['shards_total'] if view['shards_total'] else 1.0
+        return view
+
+    def path(self, job_id: str) -> Optional[str]:
+        """Path of a finished export file, or None if the job is unknown, not completed or expired."""
+        row = self._row(job_id)
+        if row is None or row['status'] != 'completed' or not os.path.exists(row['path']):
+            return None
+        return row['path']
@@ -0,0 +1,168 @@
+"""Opt-in stack-sampling profiler for Flask requests.
+
+While a request is in flight a background thread samples its stack at a fixed
+interval. When the request finishes, the samples are kept if it was randomly
+selected (``sample_rate``) or ran longer than ``slow_ms``; otherwise they are
+dropped. Kept profiles are written as collapsed stacks (the input format of
+flamegraph tools) to a directory that holds at most ``max_files`` profiles.
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+DEFAULT_INTERVAL = 0.01
+DEFAULT_MAX_FILES = 50
+
+
+def collapse_stack(frame) -> str:
+    """Root-first ``file:function`` frames joined by semicolons."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Samples the stacks of tracked threads from a daemon thread."""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = interval
+        self._tracked: Dict[int, Counter] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def track(self, thread_id: int):
+        with self._lock:
+            self._tracked[thread_id] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='stack-sampler', daemon=True)
+                self._thread.start()
+
+    def untrack(self, thread_id: int) -> Counter:
+        with self._lock:
+            return self._tracked.pop(thread_id, Counter())
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                thread_ids = list(self._tracked)
+            if not thread_ids:
+                continue
+            frames = sys._current_frames()
+            stacks = {tid: collapse_stack(frames[tid]) for tid in thread_ids if tid in frames}
+            with self._lock:
+                for tid, stack in stacks.items():
+                    if tid in self._tracked:
+                        self._tracked[tid][stack] += 1
+
+
+class ProfileStore:
+    """Bounded on-disk ring of profiles; the oldest are deleted first."""
+
+    def __init__(self, directory: str, max_files: int = DEFAULT_MAX_FILES):
+        self.directory = directory
+        # Never below one, or save() would delete the profile it just wrote
+        self.max_files = max(1, max_files)
+        self._lock = threading.Lock()
+
+    def _files(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory) if name.endswith('.json'))
+
+    def save(self, profile: Dict[str, Any]) -> str:
+        """Write a profile and return its name."""
+        name = f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{random.getrandbits(32):08x}.json"
+        profile = dict(profile, name=name)
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, name), 'w', encoding='utf-8') as f:
+                json.dump(profile, f)
+            files = self._files()
+            for old in files[:max(0, len(files) - self.max_files)]:
+                os.remove(os.path.join(self.directory, old))
+        return name
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Metadata of stored profiles, newest first."""
+        profiles = []
+        for name in reversed(self._files()):
+            profile = self.load(name)
+            if profile:
+                profile.pop('stacks', None)
+                profiles.append(profile)
+        return profiles
+
+    def load(self, name: str) -> Optional[Dict[str, Any]]:
+        if name != os.path.basename(name) or name not in self._files():
+            return None
+        try:
+            with open(os.path.join(self.directory, name), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # Deleted by the ring or half written
+            return None
+
+
+class RequestProfiler:
+    """Decides which requests to keep and hands their samples to the store."""
+
+    def __init__(self, store: ProfileStore, sample_rate: float = 0.0, slow_ms: float = 0.0,
+                 sampler: Optional[StackSampler] = None):
+        self.store = store
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.sampler = sampler or StackSampler()
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 or self.slow_ms > 0
+
+    def start(self) -> float:
+        self.sampler.track(threading.get_ident())
+        return time.perf_counter()
+
+    def finish(self, started: float, label: str) -> Optional[str]:
+        """Stop sampling the current thread; returns the profile name if it was kept."""
+        stacks = self.sampler.untrack(threading.get_ident())
+        duration_ms = (time.perf_counter() - started) * 1000
+        if self.slow_ms > 0 and duration_ms >= self.slow_ms:
+            reason = 'slow'
+        elif random.random() < self.sample_rate:
+            reason = 'sampled'
+        else:
+            return None
+        return self.store.save({
+            'label': label,
+            'reason': reason,
+            'duration_ms': round(duration_ms, 2),
+            'created': datetime.now().isoformat(),
+            'samples': sum(stacks.values()),
+            'stacks': [f'{stack} {count}' for stack, count in stacks.most_common()]
+        })
+
+
+def init_app(app, profiler: RequestProfiler):
+    """Profile every Flask request through ``profiler`` (no-op when it is disabled)."""
+    if not profiler.enabled:
+        return
+    from flask import g, request
+
+    @app.before_request
+    def _start_profile():
+        g.profile_started = profiler.start()
+
+    @app.teardown_request
+    def _finish_profile(exc):
+        started = g.pop('profile_started', None)
+        if started is not None:
+            profiler.finish(started, f'{request.method} {request.path}')
@@ -0,0 +1,146 @@
+"""Field projection for report queries.
+
+Frequently requested leaf fields are extracted from the JSON report into real
+columns of ``system_data`` at ingest. When every requested field is exactly
+such a leaf the query selects only those columns and never parses the JSON
+blob; otherwise the blob is parsed and projected in Python. Both paths return
+the same output for the same field.
+"""
+import json
+import sqlite3
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CHECKS = ['disk_encryption', 'os_updates', 'antivirus', 'sleep_settings']
+RESOURCES = ['cpu_percent', 'memory_percent', 'disk_usage_percent']
+
+# (column, JSON path) pairs extracted from each report
+EXTRACTED_COLUMNS = (
+    [('os_system', '$.os.system'), ('os_version', '$.os.version'), ('os_release', '$.os.release')]
+    + [(f'{check}_status', f'$.checks.{check}.status') for check in CHECKS]
+    + [(resource, f'$.resource_usage.{resource}') for resource in RESOURCES]
+)
+
+_OS_FIELDS = {'os.system': 'os_system', 'os.version': 'os_version', 'os.release': 'os_release'}
+
+# Output path -> column, per response shape
+REPORT_FIELDS = dict(
+    {'machine_id': 'machine_id', 'timestamp': 'timestamp'}, **_OS_FIELDS,
+    **{f'checks.{check}.status': f'{check}_status' for check in CHECKS},
+    **{f'resource_usage.{resource}': resource for resource in RESOURCES}
+)
+MACHINE_SUMMARY_FIELDS = dict(
+    {'machine_id': 'machine_id', 'last_seen': 'timestamp'}, **_OS_FIELDS,
+    **{f'status.{check}': f'{check}_status' for check in CHECKS}
+)
+MACHINE_DETAIL_FIELDS = dict(
+    {'machine_id': 'machine_id', 'last_seen': 'timestamp'}, **_OS_FIELDS,
+    **{f'status.{check}.status': f'{check}_status' for check in CHECKS},
+    **{f'checks.{check}.status': f'{check}_status' for check in CHECKS}
+)
+
+INSERT_REPORT = 'INSERT INTO system_data (machine_id, timestamp, data, {}) VALUES ({})'.format(
+    ', '.join(column for column, _ in EXTRACTED_COLUMNS),
+    ', '.join('?' * (len(EXTRACTED_COLUMNS) + 3))
+)
+
+
+def init_extracted_columns(conn: sqlite3.Connection):
+    """Add any missing extracted columns to system_data and fill them from existing rows."""
+    existing = {row[1] for row in conn.execute('PRAGMA table_info(system_data)')}
+    for column, path in EXTRACTED_COLUMNS:
+        if column not in existing:
+            conn.execute(f'ALTER TABLE system_data ADD COLUMN {column}')
+            conn.execute(f'UPDATE system_data SET {column} = json_extract(data, ?)', (path,))
+
+
+def report_row(data: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Parameters for INSERT_REPORT."""
+    values = [data['machine_id'], data['timestamp'], json.dumps(data)]
+    for _, path in EXTRACTED_COLUMNS:
+        values.append(get_path(data, path[2:]))
+    return tuple(values)
+
+
+def parse_fields(raw: Optional[str]) -> Optional[List[str]]:
+    """Split a comma separated ``fields=`` value, or None when absent."""
+    if not raw:
+        return None
+    return normalize_fields(field.strip() for field in raw.split(',') if field.strip())
+
+
+def normalize_fields(fields: Iterable[str]) -> List[str]:
+    """Drop duplicates and paths nested under another requested path.
+
+    ``os`` already contains ``os.system``, and ``timestamp.x`` cannot be
+    nested under the scalar ``timestamp``, so the broader path wins. Order of
+    first appearance is kept.
+    """
+    unique = list(dict.fromkeys(fields))
+    return [
+        field for field in unique
+        if not any(field.startswith(other + '.') for other in unique)
+    ]
+
+
+def get_path(doc: Any, path: str) -> Any:
+    """Value at a dotted path, or None if any part is missing."""
+    for key in path.split('.'):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(key)
+    return doc
+
+
+def build_doc(paths: Sequence[str], values: Sequence[Any]) -> Dict[str, Any]:
+    """Nest flat (path, value) pairs back into a document."""
+    doc: Dict[str, Any] = {}
+    for path, value in zip(paths, values):
+        *parents, leaf = path.split('.')
+        node = doc
+        for key in parents:
+            node = node.setdefault(key, {})
+        node[leaf] = value
+    return doc
+
+
+def resolve_columns(fields: Sequence[str], field_map: Dict[str, str]) -> Optional[List[Tuple[str, str]]]:
+    """Map requested fields to (path, column) pairs, or None if any field needs the JSON blob.
+
+    Only exact leaf paths are served from columns. A prefix such as ``os`` or
+    ``checks.antivirus`` may hold keys that are not extracted, so it always
+    goes through the stored report.
+    """
+    if not all(field in field_map for field in fields):
+        return None
+    return [(field, field_map[field]) for field in fields]
+
+
+def fetch(conn: sqlite3.Connection, from_sql: str, params: Sequence[Any], field_map: Dict[str, str],
+          transform: Callable[[Dict[str, Any]], Dict[str, Any]], fields: Optional[List[str]] = None,
+          columnar: bool = False) -> Any:
+    """Run a report query (``from_sql`` starts at FROM and aliases system_data as ``sd``).
+
+    Returns a list of documents, or ``{"columns": [...], "rows": [[...], ...]}``
+    when ``columnar`` is set. Columnar output without ``fields`` covers every
+    extracted field.
+    """
+    if columnar and not fields:
+        fields = list(field_map)
+    if fields:
+        fields = normalize_fields(fields)
+    pairs = resolve_columns(fields, field_map) if fields else None
+
+    if pairs is not None:
+        paths = [path for path, _ in pairs]
+        select = ', '.join(f'sd.{column}' for _, column in pairs)
+        rows = [list(row) for row in conn.execute(f'SELECT {select} {from_sql}', params)]
+    else:
+        docs = [transform(json.loads(row[0])) for row in conn.execute(f'SELECT sd.data {from_sql}', params)]
+        if not fields:
+            return docs
+        paths = fields
+        rows = [[get_path(doc, path) for path in paths] for doc in docs]
+
+    if columnar:
+        return {'columns': paths, 'rows': rows}
+    return [build_doc(paths, row) for row in rows]
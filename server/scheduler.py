@@ -0,0 +1,163 @@
+import math
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Bounds of the agent check interval (see utility/config.py)
+MIN_REPORT_INTERVAL = 900
+MAX_REPORT_INTERVAL = 3600
+
+# Width of a scheduling slot in seconds
+BUCKET_SECONDS = 60
+
+# Pending ingest requests above which the server starts widening the spread window
+QUEUE_DEPTH_THRESHOLD = 8
+
+# Never spread reports over a window wider than this many seconds
+MAX_SPREAD_SECONDS = 1800
+
+
+class ReportScheduler:
+    """Hand out next-report times so agents spread evenly over the clock.
+
+    Every report reserves a slot in a window that starts at ``interval``
+    seconds from now: the earliest slot still below its fair share of the
+    fleet, or the least loaded one when all are full. The window grows with
+    the number of in-flight ingest requests so a busy server spreads new work
+    wider. Agents clamp their sleep to [MIN_REPORT_INTERVAL,
+    MAX_REPORT_INTERVAL], so the window (including the jitter an agent adds)
+    is kept inside those bounds and shifts earlier for long intervals.
+    """
+
+    def __init__(self, bucket_seconds: int = BUCKET_SECONDS,
+                 queue_threshold: int = QUEUE_DEPTH_THRESHOLD,
+                 max_spread: int = MAX_SPREAD_SECONDS):
+        self.bucket_seconds = bucket_seconds
+        self.queue_threshold = queue_threshold
+        self.max_spread = max_spread
+        self._buckets: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def _spread_for(self, interval: int, pending: int) -> int:
+        """Width of the window an agent may be moved within."""
+        base = interval
+        pressure = 1 + pending / float(self.queue_threshold)
+        return int(min(self.max_spread, base * pressure))
+
+    def window(self, interval: int, pending: int = 0) -> Tuple[int, int]:
+        """Earliest and latest slot start, in seconds from now, for an agent.
+
+        The latest start leaves room for one slot of jitter before
+        MAX_REPORT_INTERVAL; when ``interval`` is near the maximum the window
+        extends earlier instead of later.
+        """
+        interval = max(MIN_REPORT_INTERVAL, min(MAX_REPORT_INTERVAL, int(interval)))
+        spread = self._spread_for(interval, max(0, pending))
+        latest = min(interval + spread, MAX_REPORT_INTERVAL - self.bucket_seconds)
+        earliest = max(MIN_REPORT_INTERVAL, min(interval, latest - spread))
+        return earliest, max(earliest, latest)
+
+    def _prune(self, now_bucket: int):
+        for bucket in [b for b in self._buckets if b < now_bucket]:
+            del self._buckets[bucket]
+
+    def schedule(self, interval: int, pending: int = 0,
+                 now: Optional[float] = None) -> Dict[str, int]:
+        """Reserve a slot for the next report and return the scheduling hint.
+
+        ``interval`` comes from the client and is clamped to the agent bounds.
+        """
+        interval = max(MIN_REPORT_INTERVAL, min(MAX_REPORT_INTERVAL, int(interval)))
+        earliest, latest = self.window(interval, pending)
+        now = time.time() if now is None else now
+        now_bucket = int(now // self.bucket_seconds)
+        first = int(math.ceil((now + earliest) / self.bucket_seconds))
+        last = max(first, int((now + latest) // self.bucket_seconds))
+
+        chosen = self._book(first, last, interval, now_bucket)
+        return {
+            'next_report_in': int(math.ceil(chosen * self.bucket_seconds - now)),
+            'jitter': self.bucket_seconds
+        }
+
+    def _choose(self, counts: Dict[int, int], fleet: int, first: int, last: int, interval: int) -> int:
+        """Pick a slot given current bookings and the fleet size (including this agent)."""
+        target = int(math.ceil(fleet * self.bucket_seconds / float(interval)))
+        slots = range(first, last + 1)
+        chosen = next((b for b in slots if counts.get(b, 0) < target), None)
+        if chosen is None:
+            # Every slot is full: least loaded wins, ties go to the earliest one
+            chosen = min(slots, key=lambda b: (counts.get(b, 0), b))
+        return chosen
+
+    def _book(self, first: int, last: int, interval: int, now_bucket: int) -> int:
+        with self._lock:
+            self._prune(now_bucket)
+            # Every active agent holds one future booking, so the bookings tell
+            # us the fleet size and how many reports a slot should carry
+            fleet = sum(self._buckets.values()) + 1
+            chosen = self._choose(self._buckets, fleet, first, last, interval)
+            self._buckets[chosen] = self._buckets.get(chosen, 0) + 1
+        return chosen
+
+    def load(self) -> Dict[int, int]:
+        """Snapshot of booked reports per slot start (epoch seconds)."""
+        with self._lock:
+            return {b * self.bucket_seconds: n for b, n in sorted(self._buckets.items())}
+
+
+CREATE_SCHEDULE_SLOTS = '''
+    CREATE TABLE IF NOT EXISTS schedule_slots (
+        slot INTEGER PRIMARY KEY,
+        reports INTEGER NOT NULL
+    )
+'''
+
+
+def init_schedule_table(conn: sqlite3.Connection):
+    """Create the schedule_slots table if missing."""
+    conn.execute(CREATE_SCHEDULE_SLOTS)
+
+
+class SQLiteReportScheduler(ReportScheduler):
+    """ReportScheduler whose bookings live in the database.
+
+    Every server process (e.g. gunicorn workers) sees the same bookings, so
+    the fleet size and per-slot fair share are computed for the whole fleet.
+    ``pending`` stays the queue depth of the calling process.
+    """
+
+    def __init__(self, db_path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.db_path = db_path
+
+    def _book(self, first: int, last: int, interval: int, now_bucket: int) -> int:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            init_schedule_table(conn)
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM schedule_slots WHERE slot < ?', (now_bucket,))
+            fleet = conn.execute('SELECT COALESCE(SUM(reports), 0) FROM schedule_slots').fetchone()[0] + 1
+            counts = dict(conn.execute(
+                'SELECT slot, reports FROM schedule_slots WHERE slot BETWEEN ? AND ?', (first, last)
+            ).fetchall())
+            chosen = self._choose(counts, fleet, first, last, interval)
+            conn.execute(
+                'INSERT INTO schedule_slots (slot, reports) VALUES (?, 1) '
+                'ON CONFLICT(slot) DO UPDATE SET reports = reports + 1',
+                (chosen,)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        return chosen
+
+    def load(self) -> Dict[int, int]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            init_schedule_table(conn)
+            rows = conn.execute('SELECT slot, reports FROM schedule_slots ORDER BY slot').fetchall()
+        finally:
+            conn.close()
+        return {slot * self.bucket_seconds: reports for slot, reports in rows}
@@ -0,0 +1,139 @@
+"""Full-text index over check details (SQLite FTS5).
+
+Only the latest few reports per machine are indexed so the index stays small.
+Rebuild it from stored history with:
+    python search.py [--db system_data.db] [--keep 5]
+"""
+import argparse
+import json
+import sqlite3
+from typing import Any, Dict, List, Optional
+
+# Reports per machine kept in the search index
+DEFAULT_KEEP_REPORTS = 5
+
+CREATE_SEARCH_INDEX = [
+    '''
+    CREATE TABLE IF NOT EXISTS check_details (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        report_id INTEGER NOT NULL,
+        machine_id TEXT NOT NULL,
+        timestamp TEXT NOT NULL,
+        check_name TEXT NOT NULL,
+        details TEXT NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_check_details_machine_report ON check_details (machine_id, report_id)',
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS check_details_fts USING fts5(
+        details, content='check_details', content_rowid='id'
+    )
+    ''',
+    # Keep the FTS index in sync with its content table
+    '''
+    CREATE TRIGGER IF NOT EXISTS check_details_ai AFTER INSERT ON check_details BEGIN
+        INSERT INTO check_details_fts (rowid, details) VALUES (new.id, new.details);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS check_details_ad AFTER DELETE ON check_details BEGIN
+        INSERT INTO check_details_fts (check_details_fts, rowid, details) VALUES ('delete', old.id, old.details);
+    END
+    '''
+]
+
+
+def init_search_index(conn: sqlite3.Connection):
+    """Create the check_details table, its FTS5 index and sync triggers if missing."""
+    for statement in CREATE_SEARCH_INDEX:
+        conn.execute(statement)
+
+
+def index_report(conn: sqlite3.Connection, report_id: int, data: Dict[str, Any],
+                 keep: int = DEFAULT_KEEP_REPORTS):
+    """Index the details of every check in a report, then drop reports beyond the latest ``keep``."""
+    rows = [
+        (report_id, data['machine_id'], data['timestamp'], check_name, str(check['details']))
+        for check_name, check in data.get('checks', {}).items()
+        if isinstance(check, dict) and check.get('details')
+    ]
+    conn.executemany(
+        'INSERT INTO check_details (report_id, machine_id, timestamp, check_name, details) VALUES (?, ?, ?, ?, ?)',
+        rows
+    )
+    conn.execute('''
+        DELETE FROM check_details
+        WHERE machine_id = ? AND report_id NOT IN (
+            SELECT report_id FROM check_details
+            WHERE machine_id = ?
+            GROUP BY report_id
+            ORDER BY MAX(timestamp) DESC, report_id DESC LIMIT ?
+        )
+    ''', (data['machine_id'], data['machine_id'], keep))
+
+
+def search(conn: sqlite3.Connection, query: str, check: Optional[str] = None,
+           limit: int = 50) -> List[Dict[str, Any]]:
+    """Machines whose indexed check details match an FTS5 query, best match first.
+
+    Raises sqlite3.OperationalError for malformed queries.
+    """
+    sql = '''
+        SELECT cd.machine_id, cd.check_name, cd.timestamp,
+               snippet(check_details_fts, 0, '[', ']', '...', 12) AS snippet
+        FROM check_details_fts
+        JOIN check_details cd ON cd.id = check_details_fts.rowid
+        WHERE check_details_fts MATCH ?
+    '''
+    params: List[Any] = [query]
+    if check:
+        sql += ' AND cd.check_name = ?'
+        params.append(check)
+    sql += ' ORDER BY rank'
+
+    machines: Dict[str, Dict[str, Any]] = {}
+    for machine_id, check_name, timestamp, snippet in conn.execute(sql, params):
+        if machine_id not in machines:
+            if len(machines) >= limit:
+                continue
+            machines[machine_id] = {'machine_id': machine_id, 'matches': []}
+        machines[machine_id]['matches'].append(
+            {'check': check_name, 'timestamp': timestamp, 'snippet': snippet}
+        )
+    return list(machines.values())
+
+
+def rebuild(conn: sqlite3.Connection, keep: int = DEFAULT_KEEP_REPORTS) -> int:
+    """Re-index the latest ``keep`` reports of every machine. Returns the number of reports indexed."""
+    init_search_index(conn)
+    conn.execute('DELETE FROM check_details')
+    conn.execute("INSERT INTO check_details_fts (check_details_fts) VALUES ('rebuild')")
+    total = 0
+    machines = [row[0] for row in conn.execute('SELECT DISTINCT machine_id FROM system_data')]
+    for machine_id in machines:
+        rows = conn.execute(
+            'SELECT id, data FROM system_data WHERE machine_id = ? ORDER BY timestamp DESC, id DESC LIMIT ?',
+            (machine_id, keep)
+        ).fetchall()
+        for report_id, raw in reversed(rows):
+            index_report(conn, report_id, json.loads(raw), keep)
+            total += 1
+    conn.commit()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild the check details search index.')
+    parser.add_argument('--db', default='system_data.db')
+    parser.add_argument('--keep', type=int, default=DEFAULT_KEEP_REPORTS)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        print(f"Indexed {rebuild(conn, args.keep)} reports")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -2,14 +2,22 @@ from flask import Flask, request, jsonify, send_file, make_response
 from flask_cors import CORS
 import sqlite3
 import json
+import math
 import os
 from datetime import datetime, timedelta
 import csv
 import io
 from typing import Dict, List, Any, Optional
 import logging
+import threading
 from functools import wraps
 from dotenv import load_dotenv
+from scheduler import MIN_REPORT_INTERVAL, SQLiteReportScheduler, init_schedule_table
+from events import init_events_table, latest_report, record_transitions, query_transitions
+from search import DEFAULT_KEEP_REPORTS, init_search_index, index_report, search
+import projection
+from export_jobs import DEFAULT_RETENTION_HOURS, ExportJobManager, init_export_jobs_table
+import profiling
 
 # Explicitly load .env from the server directory
 dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
@@ -38,6 +46,52 @@ else:
 app = Flask(__name__)
 CORS(app)
 
+DB_PATH = 'system_data.db'
+
+def env_number(name: str, default: float, minimum: float = 0) -> float:
+    """Numeric setting from the environment; falls back to the default on bad values."""
+    try:
+        value = float(os.getenv(name, default))
+        if not math.isfinite(value):
+            raise ValueError(name)
+        return max(minimum, value)
+    except ValueError:
+        logging.warning(f"Invalid {name}={os.getenv(name)!r}, using {default}")
+        return default
+
+# Opt-in request profiling: keep a random fraction of requests and every slow one
+request_profiler = profiling.RequestProfiler(
+    profiling.ProfileStore(
+        os.getenv('PROFILE_DIR', 'profiles'),
+        int(env_number('PROFILE_MAX_FILES', profiling.DEFAULT_MAX_FILES, minimum=1))
+    ),
+    sample_rate=min(1.0, env_number('PROFILE_SAMPLE_RATE', 0)),
+    slow_ms=env_number('PROFILE_SLOW_MS', 0)
+)
+profiling.init_app(app, request_profiler)
+
+# Bulk export jobs run on a process pool and write gzip files here; job state
+# is stored in the database so every server process can serve it
+export_jobs = ExportJobManager(
+    DB_PATH,
+    os.getenv('EXPORT_DIR', 'exports'),
+    retention_hours=env_number('EXPORT_RETENTION_HOURS', DEFAULT_RETENTION_HOURS)
+)
+
+# Number of latest reports per machine kept in the full-text search index
+SEARCH_KEEP_REPORTS = int(env_number('SEARCH_KEEP_REPORTS', DEFAULT_KEEP_REPORTS, minimum=1))
+
+# Compact encoding for bulk consumers: {"columns": [...], "rows": [[...], ...]}
+COLUMNAR_MIMETYPE = 'application/vnd.system-monitor.columnar+json'
+
+# Report scheduling: spreads agent check-ins across the clock. Bookings are
+# stored in the database so all server processes share them; the pending
+# count is this process's own ingest queue depth.
+DEFAULT_REPORT_INTERVAL = MIN_REPORT_INTERVAL
+report_scheduler = SQLiteReportScheduler(DB_PATH)
+ingest_pending = 0
+ingest_lock = threading.Lock()
+
 # Health check endpoint - moved to top
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -47,7 +101,7 @@ def health_check():
 
 # Database setup
 def init_db():
-    conn = sqlite3.connect('system_data.db')
+    conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
     c.execute('''
         CREATE TABLE IF NOT EXISTS system_data (
@@ -57,11 +111,19 @@ def init_db():
             data TEXT NOT NULL
         )
     ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_system_data_machine_ts ON system_data (machine_id, timestamp)')
+    # Time-range scans: export shards and unfiltered history queries
+    c.execute('CREATE INDEX IF NOT EXISTS idx_system_data_ts ON system_data (timestamp)')
+    init_events_table(conn)
+    init_search_index(conn)
+    projection.init_extracted_columns(conn)
+    init_export_jobs_table(conn)
+    init_schedule_table(conn)
     conn.commit()
     conn.close()
 
 def get_db():
-    conn = sqlite3.connect('system_data.db')
+    conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -90,6 +152,46 @@ def handle_errors(f):
             return jsonify({"error": "Internal server error"}), 500
     return decorated_function
 
+def summarize_machine(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a report into a /machines list entry."""
+    return {
+        'machine_id': data['machine_id'],
+        'last_seen': data['timestamp'],
+        'os': data['os'],
+        'status': {
+            'disk_encryption': data['checks']['disk_encryption']['status'],
+            'os_updates': data['checks']['os_updates']['status'],
+            'antivirus': data['checks']['antivirus']['status'],
+            'sleep_settings': data['checks']['sleep_settings']['status']
+        }
+    }
+
+def machine_details(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Transform a report to match the client's expected machine detail structure."""
+    return {
+        'machine_id': data['machine_id'],
+        'last_seen': data['timestamp'],
+        'os': data['os'],
+        'status': {
+            'disk_encryption': data['checks']['disk_encryption'],
+            'os_updates': data['checks']['os_updates'],
+            'antivirus': data['checks']['antivirus'],
+            'sleep_settings': data['checks']['sleep_settings']
+        },
+        'checks': data['checks']
+    }
+
+def wants_columnar() -> bool:
+    """Columnar encoding is opt-in via ?format=columnar or the Accept header."""
+    return (request.args.get('format') == 'columnar'
+            or COLUMNAR_MIMETYPE in request.headers.get('Accept', ''))
+
+def projected_response(result: Any):
+    response = jsonify(result)
+    if isinstance(result, dict) and 'columns' in result and 'rows' in result:
+        response.mimetype = COLUMNAR_MIMETYPE
+    return response
+
 @app.route('/system-data', methods=['POST'])
 @require_api_key
 @handle_errors
@@ -104,92 +206,96 @@ def receive_system_data():
         logging.error(f"Missing required fields. Received: {list(data.keys())}")
         return jsonify({"error": "Missing required fields"}), 400
 
+    global ingest_pending
+    with ingest_lock:
+        ingest_pending += 1
+        pending = ingest_pending
     try:
         conn = get_db()
-        c = conn.cursor()
-        c.execute(
-            'INSERT INTO system_data (machine_id, timestamp, data) VALUES (?, ?, ?)',
-            (data['machine_id'], data['timestamp'], json.dumps(data))
-        )
-        conn.commit()
-        conn.close()
-
-        logging.info(f"Successfully received data from machine {data['machine_id']}")
-        return jsonify({"status": "success"}), 200
+        try:
+            # Take the write lock before reading the previous report so that
+            # overlapping reports from one machine are compared in order
+            conn.execute('BEGIN IMMEDIATE')
+            c = conn.cursor()
+            previous = latest_report(conn, data['machine_id'])
+            c.execute(projection.INSERT_REPORT, projection.report_row(data))
+            record_transitions(conn, previous, data)
+            index_report(conn, c.lastrowid, data, SEARCH_KEEP_REPORTS)
+            conn.commit()
+        finally:
+            conn.close()
     except Exception as e:
         logging.error(f"Database error: {str(e)}")
         return jsonify({"error": "Database error"}), 500
+    finally:
+        with ingest_lock:
+            ingest_pending -= 1
+
+    # The report is stored: hint when the agent should report next, based on
+    # ingest load. The scheduler clamps the client-supplied interval.
+    interval = request.headers.get('X-Report-Interval', default=DEFAULT_REPORT_INTERVAL, type=int)
+    try:
+        schedule = report_scheduler.schedule(interval, pending=pending)
+    except Exception as e:
+        # Never fail a stored report: the agent falls back to its own interval
+        logging.error(f"Error scheduling next report: {str(e)}")
+        schedule = None
+
+    logging.info(f"Successfully received data from machine {data['machine_id']}")
+    return jsonify({"status": "success", "schedule": schedule}), 200
 
 @app.route('/machines', methods=['GET'])
 @require_api_key
 @handle_errors
 def list_machines():
     conn = get_db()
-    c = conn.cursor()
     
     # Get unique machines with their latest data
-    c.execute('''
-        SELECT DISTINCT machine_id, 
-               (SELECT data FROM system_data 
-                WHERE machine_id = sd.machine_id 
-                ORDER BY timestamp DESC LIMIT 1) as latest_data
-        FROM system_data sd
-    ''')
-    
-    machines = []
-    for row in c.fetchall():
-        data = json.loads(row['latest_data'])
-        machines.append({
-            'machine_id': row['machine_id'],
-            'last_seen': data['timestamp'],
-            'os': data['os'],
-            'status': {
-                'disk_encryption': data['checks']['disk_encryption']['status'],
-                'os_updates': data['checks']['os_updates']['status'],
-                'antivirus': data['checks']['antivirus']['status'],
-                'sleep_settings': data['checks']['sleep_settings']['status']
-            }
-        })
+    machines = projection.fetch(
+        conn,
+        '''
+        FROM (SELECT DISTINCT machine_id FROM system_data) m
+        JOIN system_data sd ON sd.id = (
+            SELECT id FROM system_data
+            WHERE machine_id = m.machine_id
+            ORDER BY timestamp DESC LIMIT 1)
+        ''',
+        [],
+        projection.MACHINE_SUMMARY_FIELDS,
+        summarize_machine,
+        fields=projection.parse_fields(request.args.get('fields')),
+        columnar=wants_columnar()
+    )
     
     conn.close()
-    return jsonify(machines)
+    return projected_response(machines)
 
 @app.route('/machine/<machine_id>', methods=['GET'])
 @require_api_key
 @handle_errors
 def get_machine_status(machine_id: str):
     conn = get_db()
-    c = conn.cursor()
     
     # Get latest data for the machine
-    c.execute('''
-        SELECT data FROM system_data 
+    result = projection.fetch(
+        conn,
+        '''
+        FROM system_data sd
         WHERE machine_id = ? 
         ORDER BY timestamp DESC LIMIT 1
-    ''', (machine_id,))
+        ''',
+        [machine_id],
+        projection.MACHINE_DETAIL_FIELDS,
+        machine_details,
+        fields=projection.parse_fields(request.args.get('fields')),
+        columnar=wants_columnar()
+    )
+    conn.close()
     
-    row = c.fetchone()
-    if not row:
+    found = result['rows'] if isinstance(result, dict) else result
+    if not found:
         return jsonify({"error": "Machine not found"}), 404
-    
-    data = json.loads(row['data'])
-    
-    # Transform the data to match the client's expected structure
-    transformed_data = {
-        'machine_id': data['machine_id'],
-        'last_seen': data['timestamp'],
-        'os': data['os'],
-        'status': {
-            'disk_encryption': data['checks']['disk_encryption'],
-            'os_updates': data['checks']['os_updates'],
-            'antivirus': data['checks']['antivirus'],
-            'sleep_settings': data['checks']['sleep_settings']
-        },
-        'checks': data['checks']
-    }
-    
-    conn.close()
-    return jsonify(transformed_data)
+    return projected_response(result if isinstance(result, dict) else result[0])
 
 @app.route('/machine/<machine_id>/history', methods=['GET'])
 @require_api_key
@@ -201,9 +307,8 @@ def get_machine_history(machine_id: str):
     limit = request.args.get('limit', default=100, type=int)
     
     conn = get_db()
-    c = conn.cursor()
     
-    query = 'SELECT data FROM system_data WHERE machine_id = ?'
+    query = 'FROM system_data sd WHERE machine_id = ?'
     params = [machine_id]
     
     if start_date:
@@ -216,11 +321,59 @@ def get_machine_history(machine_id: str):
     query += ' ORDER BY timestamp DESC LIMIT ?'
     params.append(limit)
     
-    c.execute(query, params)
-    history = [json.loads(row['data']) for row in c.fetchall()]
+    history = projection.fetch(
+        conn,
+        query,
+        params,
+        projection.REPORT_FIELDS,
+        lambda data: data,
+        fields=projection.parse_fields(request.args.get('fields')),
+        columnar=wants_columnar()
+    )
     
     conn.close()
-    return jsonify(history)
+    return projected_response(history)
+
+@app.route('/events/transitions', methods=['GET'])
+@require_api_key
+@handle_errors
+def get_transitions():
+    conn = get_db()
+    events = query_transitions(
+        conn,
+        check=request.args.get('check'),
+        since=request.args.get('since'),
+        until=request.args.get('until'),
+        from_status=request.args.get('from'),
+        to_status=request.args.get('to'),
+        machine_id=request.args.get('machine_id'),
+        limit=request.args.get('limit', default=1000, type=int)
+    )
+    conn.close()
+    return jsonify(events)
+
+@app.route('/search', methods=['GET'])
+@require_api_key
+@handle_errors
+def search_details():
+    query = request.args.get('q')
+    if not query:
+        return jsonify({"error": "Missing search query"}), 400
+
+    conn = get_db()
+    try:
+        results = search(
+            conn,
+            query,
+            check=request.args.get('check'),
+            limit=request.args.get('limit', default=50, type=int)
+        )
+    except sqlite3.OperationalError as e:
+        logging.warning(f"Invalid search query {query!r}: {str(e)}")
+        return jsonify({"error": "Invalid search query"}), 400
+    finally:
+        conn.close()
+    return jsonify(results)
 
 @app.route('/export/csv', methods=['GET'])
 @require_api_key
@@ -316,6 +469,71 @@ def export_csv():
     conn.close()
     return response
 
+@app.route('/export/jobs', methods=['POST'])
+@require_api_key
+@handle_errors
+def create_export_job():
+    params = request.get_json(silent=True) or request.args
+    try:
+        job = export_jobs.create(
+            fmt=params.get('format', 'ndjson'),
+            start=params.get('start_date'),
+            end=params.get('end_date'),
+            filters={
+                'machine_id': params.get('machine_id'),
+                'os_system': params.get('os_system')
+            }
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    logging.info(f"Started export job {job['job_id']} with {job['shards_total']} shards")
+    return jsonify(job), 202
+
+@app.route('/export/jobs/<job_id>', methods=['GET'])
+@require_api_key
+@handle_errors
+def get_export_job(job_id: str):
+    job = export_jobs.status(job_id)
+    if not job:
+        return jsonify({"error": "Export job not found"}), 404
+    return jsonify(job)
+
+@app.route('/export/jobs/<job_id>/download', methods=['GET'])
+@require_api_key
+@handle_errors
+def download_export_job(job_id: str):
+    job = export_jobs.status(job_id)
+    if not job:
+        return jsonify({"error": "Export job not found"}), 404
+    path = export_jobs.path(job_id)
+    if not path:
+        return jsonify({"error": f"Export job is {job['status']}"}), 409
+
+    # conditional=True enables Range requests for resumable downloads
+    return send_file(
+        os.path.abspath(path),
+        mimetype='application/gzip',
+        as_attachment=True,
+        download_name=f"system_health_export.{job['format']}.gz",
+        conditional=True
+    )
+
+@app.route('/admin/profiles', methods=['GET'])
+@require_api_key
+@handle_errors
+def list_profiles():
+    return jsonify(request_profiler.store.list())
+
+@app.route('/admin/profiles/<name>', methods=['GET'])
+@require_api_key
+@handle_errors
+def get_profile(name: str):
+    profile = request_profiler.store.load(name)
+    if not profile:
+        return jsonify({"error": "Profile not found"}), 404
+    return jsonify(profile)
+
 if __name__ == '__main__':
     init_db()
     app.run(host='0.0.0.0', port=5000, debug=True) 
\ No newline at end of file
@@ -0,0 +1,78 @@
+"""Simulate fleet ingest load with and without server scheduling hints.
+
+Usage:
+    python simulate_schedule.py [--agents 2000] [--hours 6] [--interval 900 3600]
+"""
+import argparse
+import heapq
+import random
+from collections import Counter
+
+from scheduler import MAX_REPORT_INTERVAL as MAX_INTERVAL, MIN_REPORT_INTERVAL as MIN_INTERVAL, ReportScheduler
+
+
+def simulate(agents: int, hours: float, interval: int, use_hints: bool, seed: int = 42) -> Counter:
+    """Return report counts per minute for one simulated run."""
+    rng = random.Random(seed)
+    scheduler = ReportScheduler()
+    end = hours * 3600
+    per_minute = Counter()
+
+    # Every agent boots within the same minute, e.g. after a deployment
+    events = [(rng.uniform(0, 60), agent) for agent in range(agents)]
+    heapq.heapify(events)
+
+    while events:
+        now, agent = heapq.heappop(events)
+        if now >= end:
+            break
+        per_minute[int(now // 60)] += 1
+        cycle = rng.uniform(1, 5)  # time spent running the checks
+
+        if use_hints:
+            hint = scheduler.schedule(interval, now=now)
+            delay = hint['next_report_in'] + rng.uniform(0, hint['jitter'])
+            delay = max(MIN_INTERVAL, min(MAX_INTERVAL, delay))
+        else:
+            delay = interval
+        heapq.heappush(events, (now + cycle + delay, agent))
+
+    return per_minute
+
+
+def summarize(per_minute: Counter, hours: float) -> dict:
+    minutes = int(hours * 60)
+    counts = [per_minute.get(m, 0) for m in range(minutes)]
+    # Skip the boot storm and the first reporting round (at most one maximum
+    # interval), during which agents are still being moved to their slots
+    warmup = counts[:MAX_INTERVAL // 60]
+    steady = counts[MAX_INTERVAL // 60:]
+    return {
+        'first_round_peak': max(warmup[1:]),
+        'peak': max(steady),
+        'average': sum(steady) / float(len(steady)),
+        'busy_minutes': sum(1 for c in steady if c)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--agents', type=int, default=2000)
+    parser.add_argument('--hours', type=float, default=6)
+    parser.add_argument('--interval', type=int, nargs='+', default=[MIN_INTERVAL, MAX_INTERVAL])
+    args = parser.parse_args()
+    if args.hours * 60 <= MAX_INTERVAL // 60:
+        parser.error(f'--hours must cover more than the {MAX_INTERVAL // 3600}h warm-up')
+
+    for interval in args.interval:
+        print(f"{args.agents} agents, {interval}s interval, {args.hours}h simulated (reports/minute)")
+        print(f"{'mode':<14}{'round 1 peak':>14}{'peak':>8}{'average':>10}{'peak/avg':>10}{'busy min':>10}")
+        for label, use_hints in (('fixed sleep', False), ('server hints', True)):
+            stats = summarize(simulate(args.agents, args.hours, interval, use_hints), args.hours)
+            ratio = stats['peak'] / stats['average']
+            print(f"{label:<14}{stats['first_round_peak']:>14}{stats['peak']:>8}{stats['average']:>10.1f}"
+                  f"{ratio:>10.1f}{stats['busy_minutes']:>10}")
+        print()
+
+if __name__ == '__main__':
+    main()
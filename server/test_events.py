@@ -0,0 +1,106 @@
+import json
+import sqlite3
+
+from backfill_events import backfill
+from events import detect_transitions, init_events_table, latest_report, query_transitions, record_transitions
+
+
+def report(machine_id, timestamp, encryption, updates='up_to_date'):
+    return {
+        'machine_id': machine_id,
+        'timestamp': timestamp,
+        'checks': {
+            'disk_encryption': {'status': encryption},
+            'os_updates': {'status': updates}
+        }
+    }
+
+
+def make_db():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('''
+        CREATE TABLE system_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            machine_id TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            data TEXT NOT NULL
+        )
+    ''')
+    init_events_table(conn)
+    return conn
+
+
+def ingest(conn, data):
+    """Mirror of the /system-data ingest path."""
+    previous = latest_report(conn, data['machine_id'])
+    conn.execute(
+        'INSERT INTO system_data (machine_id, timestamp, data) VALUES (?, ?, ?)',
+        (data['machine_id'], data['timestamp'], json.dumps(data))
+    )
+    return record_transitions(conn, previous, data)
+
+
+def test_detect_transitions():
+    before = report('a', '2024-01-01T00:00:00', 'encrypted')
+    after = report('a', '2024-01-02T00:00:00', 'unencrypted', 'updates_available')
+    assert detect_transitions(None, after) == []
+    assert detect_transitions(before, before) == []
+    assert detect_transitions(before, after) == [
+        ('disk_encryption', 'encrypted', 'unencrypted'),
+        ('os_updates', 'up_to_date', 'updates_available')
+    ]
+
+
+def test_detect_added_and_removed_checks():
+    before = report('a', '2024-01-01T00:00:00', 'encrypted')
+    after = dict(before, checks={'antivirus': {'status': 'active'}})
+    assert detect_transitions(before, after) == [
+        ('antivirus', None, 'active'),
+        ('disk_encryption', 'encrypted', None),
+        ('os_updates', 'up_to_date', None)
+    ]
+
+
+def test_detect_malformed_checks():
+    before = report('a', '2024-01-01T00:00:00', 'encrypted')
+    after = dict(before, checks={'disk_encryption': 'encrypted', 'os_updates': None})
+    assert detect_transitions(before, after) == [
+        ('disk_encryption', 'encrypted', None),
+        ('os_updates', 'up_to_date', None)
+    ]
+    assert detect_transitions(after, dict(before, checks=['disk_encryption'])) == []
+
+
+def test_late_report_records_nothing():
+    conn = make_db()
+    assert ingest(conn, report('a', '2024-01-01T00:00:00', 'encrypted')) == 0
+    assert ingest(conn, report('a', '2024-01-03T00:00:00', 'unencrypted')) == 1
+    # Arrives after the 3rd but is older: must not compare against it
+    assert ingest(conn, report('a', '2024-01-02T00:00:00', 'encrypted')) == 0
+    assert ingest(conn, report('a', '2024-01-04T00:00:00', 'encrypted')) == 1
+
+    events = query_transitions(conn, check='disk_encryption')
+    assert [(e['from_status'], e['to_status'], e['timestamp']) for e in events] == [
+        ('unencrypted', 'encrypted', '2024-01-04T00:00:00'),
+        ('encrypted', 'unencrypted', '2024-01-03T00:00:00')
+    ]
+
+
+def test_backfill_matches_ingest():
+    conn = make_db()
+    reports = [
+        report('a', '2024-01-01T00:00:00', 'encrypted'),
+        report('b', '2024-01-01T00:00:00', 'unencrypted'),
+        report('a', '2024-01-03T00:00:00', 'unencrypted'),
+        # Late report with a status seen nowhere else
+        report('a', '2024-01-02T00:00:00', 'unknown'),
+        report('b', '2024-01-02T00:00:00', 'encrypted', 'updates_available'),
+        report('a', '2024-01-04T00:00:00', 'encrypted'),
+    ]
+    for data in reports:
+        ingest(conn, data)
+    at_ingest = query_transitions(conn)
+
+    assert backfill(conn) == len(at_ingest)
+    assert sorted(map(sorted, map(dict.items, query_transitions(conn)))) == \
+        sorted(map(sorted, map(dict.items, at_ingest)))
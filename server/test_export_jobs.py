@@ -0,0 +1,103 @@
+import gzip
+import json
+import os
+import sqlite3
+import time
+
+import pytest
+
+import projection
+from bench_projection import make_report
+from export_jobs import ExportJobManager, _split_range, export_shard
+
+
+def make_db(path, reports=50):
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE system_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            machine_id TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            data TEXT NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX idx_system_data_ts ON system_data (timestamp)')
+    projection.init_extracted_columns(conn)
+    for i in range(reports):
+        data = make_report(i)
+        data['timestamp'] = f'2024-01-{i % 28 + 1:02d}T{i % 24:02d}:00:00'
+        conn.execute(projection.INSERT_REPORT, projection.report_row(data))
+    conn.commit()
+    conn.close()
+
+
+def wait(manager, job_id, timeout=30):
+    deadline = time.time() + timeout
+    while manager.status(job_id)['status'] == 'running':
+        assert time.time() < deadline
+        time.sleep(0.05)
+    return manager.status(job_id)
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / 'system_data.db')
+    make_db(path)
+    return path
+
+
+def test_export_is_visible_to_other_processes(db, tmp_path):
+    creator = ExportJobManager(db, str(tmp_path / 'exports'), workers=2)
+    job = creator.create('ndjson', shards=4)
+
+    # A second manager stands in for another gunicorn worker
+    other = ExportJobManager(db, str(tmp_path / 'exports'), workers=2)
+    status = wait(other, job['job_id'])
+    assert status['status'] == 'completed'
+    assert status['rows'] == 50
+    assert status['progress'] == 1.0
+
+    with gzip.open(other.path(job['job_id']), 'rt') as f:
+        timestamps = [json.loads(line)['timestamp'] for line in f]
+    assert timestamps == sorted(timestamps) and len(timestamps) == 50
+
+
+def test_timezone_aware_bounds_are_rejected(db, tmp_path):
+    manager = ExportJobManager(db, str(tmp_path / 'exports'))
+    for bad in ('2024-01-01T00:00:00+00:00', '2024-01-01T00:00:00Z', 'yesterday'):
+        with pytest.raises(ValueError):
+            manager.create('ndjson', start=bad)
+
+
+def test_non_string_bounds_are_rejected(db, tmp_path):
+    manager = ExportJobManager(db, str(tmp_path / 'exports'))
+    for bad in (20240101, ['2024-01-01'], {'date': '2024-01-01'}):
+        with pytest.raises(ValueError):
+            manager.create('ndjson', start=bad)
+
+
+def test_os_system_filter_ignores_case(db, tmp_path):
+    rows = []
+    for i, os_system in enumerate(('Linux', 'linux', 'LINUX', 'Windows')):
+        out = str(tmp_path / f'part{i}.gz')
+        rows.append(export_shard(db, out, '2024-01-01T00:00:00', '2024-12-31T00:00:00', True,
+                                 'ndjson', {'os_system': os_system}))
+    assert rows == [50, 50, 50, 0]
+
+
+def test_split_range_tolerates_mixed_timestamps():
+    assert _split_range('2024-01-01T00:00:00', '2024-01-02T00:00:00+00:00', 4) == \
+        [('2024-01-01T00:00:00', '2024-01-02T00:00:00+00:00')]
+    assert len(_split_range('2024-01-01T00:00:00', '2024-01-02T00:00:00', 4)) == 4
+
+
+def test_expired_jobs_are_deleted(db, tmp_path):
+    manager = ExportJobManager(db, str(tmp_path / 'exports'), workers=1, retention_hours=0)
+    job = manager.create('columnar')
+    wait(manager, job['job_id'])
+    path = os.path.join(str(tmp_path / 'exports'), f"{job['job_id']}.columnar.gz")
+    assert os.path.exists(path)
+
+    assert manager.cleanup() == 1
+    assert not os.path.exists(path)
+    assert manager.status(job['job_id']) is None
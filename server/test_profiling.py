@@ -0,0 +1,30 @@
+import time
+
+from profiling import ProfileStore, RequestProfiler
+
+
+def test_max_files_zero_keeps_latest_profile(tmp_path):
+    store = ProfileStore(str(tmp_path), max_files=0)
+    first = store.save({'label': 'GET /a'})
+    time.sleep(0.001)
+    second = store.save({'label': 'GET /b'})
+    assert store.load(first) is None
+    assert store.load(second)['label'] == 'GET /b'
+    assert [p['name'] for p in store.list()] == [second]
+
+
+def test_slow_requests_are_kept(tmp_path):
+    profiler = RequestProfiler(ProfileStore(str(tmp_path), max_files=5), slow_ms=20)
+    started = profiler.start()
+    assert profiler.finish(started, 'GET /fast') is None
+
+    started = profiler.start()
+    time.sleep(0.05)
+    name = profiler.finish(started, 'GET /slow')
+    profile = profiler.store.load(name)
+    assert profile['reason'] == 'slow' and profile['label'] == 'GET /slow'
+    assert profile['samples'] > 0
+
+
+def test_load_rejects_paths_outside_store(tmp_path):
+    assert ProfileStore(str(tmp_path)).load('../system_data.db') is None
@@ -0,0 +1,101 @@
+import json
+
+import projection
+from bench_projection import build_db, make_report
+
+HISTORY_SQL = 'FROM system_data sd WHERE machine_id = ? ORDER BY timestamp DESC LIMIT 2'
+PARAMS = ['bench-machine']
+
+
+def summarize(data):
+    return {
+        'machine_id': data['machine_id'],
+        'last_seen': data['timestamp'],
+        'os': data['os'],
+        'status': {check: data['checks'][check]['status'] for check in projection.CHECKS}
+    }
+
+
+def details(data):
+    return {
+        'machine_id': data['machine_id'],
+        'last_seen': data['timestamp'],
+        'os': data['os'],
+        'status': {check: data['checks'][check] for check in projection.CHECKS},
+        'checks': data['checks']
+    }
+
+
+SHAPES = [
+    (projection.REPORT_FIELDS, lambda data: data),
+    (projection.MACHINE_SUMMARY_FIELDS, summarize),
+    (projection.MACHINE_DETAIL_FIELDS, details),
+]
+
+
+def make_conn():
+    conn = build_db(3)
+    # A client that reports keys the server does not extract
+    extra = make_report(99)
+    extra['os']['build'] = '22631'
+    extra['resource_usage']['swap_percent'] = 3.0
+    conn.execute(projection.INSERT_REPORT, projection.report_row(extra))
+    return conn
+
+
+def parsed(conn, field_map, transform, fields):
+    """Expected output: project the fully parsed responses by hand."""
+    docs = [transform(json.loads(raw)) for (raw,) in conn.execute(f'SELECT sd.data {HISTORY_SQL}', PARAMS)]
+    fields = projection.normalize_fields(fields)
+    return [projection.build_doc(fields, [projection.get_path(doc, f) for f in fields]) for doc in docs]
+
+
+def test_column_and_parse_paths_agree():
+    conn = make_conn()
+    for field_map, transform in SHAPES:
+        candidates = list(field_map) + ['os', 'checks', 'checks.antivirus', 'status', 'resource_usage',
+                                        'checks.antivirus.name', 'os.system.name']
+        for field in candidates:
+            got = projection.fetch(conn, HISTORY_SQL, PARAMS, field_map, transform, fields=[field])
+            assert got == parsed(conn, field_map, transform, [field]), field
+            # Mixing in a field that forces the parse path must not change the shape
+            mixed = projection.fetch(conn, HISTORY_SQL, PARAMS, field_map, transform,
+                                     fields=[field, 'checks.antivirus.name'])
+            assert mixed == parsed(conn, field_map, transform, [field, 'checks.antivirus.name']), field
+
+
+def test_prefix_keeps_unextracted_keys():
+    conn = make_conn()
+    history = projection.fetch(conn, HISTORY_SQL, PARAMS, projection.REPORT_FIELDS, lambda data: data,
+                               fields=['checks.antivirus', 'os', 'resource_usage'])
+    assert history[0]['checks']['antivirus']['name'] == 'ClamAV'
+    assert 'details' in history[0]['checks']['antivirus']
+    assert history[0]['os']['build'] == '22631'
+    assert history[0]['resource_usage']['swap_percent'] == 3.0
+
+    machine = projection.fetch(conn, HISTORY_SQL, PARAMS, projection.MACHINE_DETAIL_FIELDS, details,
+                               fields=['status'])
+    assert 'details' in machine[0]['status']['disk_encryption']
+
+
+def test_overlapping_paths_do_not_crash():
+    conn = make_conn()
+    for fields, expected in ((['timestamp', 'timestamp.x'], ['timestamp']),
+                             (['os', 'os.system.name'], ['os']),
+                             (['os.system.name', 'os', 'os'], ['os'])):
+        assert projection.normalize_fields(fields) == expected
+        result = projection.fetch(conn, HISTORY_SQL, PARAMS, projection.REPORT_FIELDS, lambda data: data,
+                                  fields=fields)
+        assert [list(doc) for doc in result] == [expected, expected]
+    assert projection.parse_fields('timestamp, timestamp.x,') == ['timestamp']
+
+
+def test_columnar_matches_documents():
+    conn = make_conn()
+    fields = ['timestamp', 'checks.os_updates.status', 'resource_usage.cpu_percent']
+    columnar = projection.fetch(conn, HISTORY_SQL, PARAMS, projection.REPORT_FIELDS, lambda data: data,
+                                fields=fields, columnar=True)
+    docs = projection.fetch(conn, HISTORY_SQL, PARAMS, projection.REPORT_FIELDS, lambda data: data,
+                            fields=fields)
+    assert columnar['columns'] == fields
+    assert [projection.build_doc(fields, row) for row in columnar['rows']] == docs
@@ -0,0 +1,79 @@
+import pytest
+
+from scheduler import (BUCKET_SECONDS, MAX_REPORT_INTERVAL, MIN_REPORT_INTERVAL, ReportScheduler,
+                       SQLiteReportScheduler)
+
+NOW = 1700000000.0
+
+
+def assert_within_agent_bounds(hint):
+    """The agent sleeps next_report_in plus up to jitter, clamped to the agent bounds."""
+    assert hint['jitter'] == BUCKET_SECONDS
+    assert hint['next_report_in'] >= MIN_REPORT_INTERVAL
+    assert hint['next_report_in'] + hint['jitter'] <= MAX_REPORT_INTERVAL
+
+
+def test_hint_within_interval_window():
+    hint = ReportScheduler().schedule(900, now=NOW)
+    assert_within_agent_bounds(hint)
+    assert 900 <= hint['next_report_in'] <= 900 + 900 + BUCKET_SECONDS
+
+
+def test_spreads_agents_reporting_together():
+    scheduler = ReportScheduler()
+    hints = [scheduler.schedule(900, now=NOW)['next_report_in'] for _ in range(100)]
+    assert len(set(hints)) > 1
+    assert max(scheduler.load().values()) < 100
+
+
+def test_zero_and_negative_intervals_are_clamped():
+    for interval in (0, -5, 1):
+        hint = ReportScheduler().schedule(interval, now=NOW)
+        assert_within_agent_bounds(hint)
+
+
+def test_huge_interval_is_clamped():
+    hint = ReportScheduler().schedule(10 ** 9, now=NOW)
+    assert_within_agent_bounds(hint)
+
+
+def test_odd_interval_and_negative_pending():
+    hint = ReportScheduler().schedule(1237, pending=-3, now=NOW + 0.5)
+    assert_within_agent_bounds(hint)
+    assert 1237 <= hint['next_report_in']
+
+
+@pytest.mark.parametrize('interval', [900, 1237, 1800, 2700, 3540, 3600])
+@pytest.mark.parametrize('pending', [0, 50])
+def test_fleet_hints_stay_within_agent_bounds(interval, pending):
+    scheduler = ReportScheduler()
+    for i in range(300):
+        assert_within_agent_bounds(scheduler.schedule(interval, pending=pending, now=NOW + i * 0.7))
+
+
+def test_max_interval_spreads_earlier():
+    scheduler = ReportScheduler()
+    hints = [scheduler.schedule(MAX_REPORT_INTERVAL, now=NOW)['next_report_in'] for _ in range(500)]
+    assert max(hints) + BUCKET_SECONDS <= MAX_REPORT_INTERVAL
+    # 500 agents are spread over many slots instead of piling up at the cap
+    assert len(set(hints)) >= 20
+    assert max(scheduler.load().values()) <= 500 // 20
+
+
+def test_expired_bookings_are_pruned():
+    scheduler = ReportScheduler()
+    scheduler.schedule(900, now=NOW)
+    scheduler.schedule(900, now=NOW + 10 * MAX_REPORT_INTERVAL)
+    assert sum(scheduler.load().values()) == 1
+
+
+def test_sqlite_bookings_are_shared(tmp_path):
+    db = str(tmp_path / 'system_data.db')
+    # Two instances stand in for two gunicorn workers
+    workers = [SQLiteReportScheduler(db), SQLiteReportScheduler(db)]
+    shared, local = [], ReportScheduler()
+    for i in range(200):
+        shared.append(workers[i % 2].schedule(900, now=NOW)['next_report_in'])
+        local.schedule(900, now=NOW)
+    assert sum(workers[0].load().values()) == 200
+    assert workers[0].load() == workers[1].load() == local.load()
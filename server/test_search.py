@@ -0,0 +1,133 @@
+import json
+import sqlite3
+
+import pytest
+
+from search import index_report, init_search_index, rebuild, search
+
+
+def report(machine_id, timestamp, details, antivirus='ClamAV signatures current'):
+    return {
+        'machine_id': machine_id,
+        'timestamp': timestamp,
+        'checks': {
+            'os_updates': {'status': 'updates_available', 'details': details},
+            'antivirus': {'status': 'active', 'details': antivirus},
+            'sleep_settings': {'status': 'ok'}
+        }
+    }
+
+
+def make_db():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('''
+        CREATE TABLE system_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            machine_id TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            data TEXT NOT NULL
+        )
+    ''')
+    init_search_index(conn)
+    return conn
+
+
+def ingest(conn, data, keep=2):
+    """Mirror of the /system-data ingest path."""
+    c = conn.execute(
+        'INSERT INTO system_data (machine_id, timestamp, data) VALUES (?, ?, ?)',
+        (data['machine_id'], data['timestamp'], json.dumps(data))
+    )
+    index_report(conn, c.lastrowid, data, keep)
+    return c.lastrowid
+
+
+def indexed(conn, machine_id):
+    return [row[0] for row in conn.execute(
+        'SELECT DISTINCT timestamp FROM check_details WHERE machine_id = ? ORDER BY timestamp', (machine_id,)
+    )]
+
+
+def assert_index_in_sync(conn):
+    # Raises sqlite3.DatabaseError when the FTS index and check_details disagree
+    conn.execute("INSERT INTO check_details_fts (check_details_fts) VALUES ('integrity-check')")
+
+
+def test_index_keeps_latest_reports():
+    conn = make_db()
+    for day in (1, 2, 4):
+        ingest(conn, report('a', f'2024-01-0{day}T00:00:00', f'openssl day{day}'))
+    assert indexed(conn, 'a') == ['2024-01-02T00:00:00', '2024-01-04T00:00:00']
+
+    # A late report older than everything kept is dropped right away
+    ingest(conn, report('a', '2024-01-01T12:00:00', 'openssl late'))
+    assert indexed(conn, 'a') == ['2024-01-02T00:00:00', '2024-01-04T00:00:00']
+    # A late report newer than the oldest kept one replaces it
+    ingest(conn, report('a', '2024-01-03T00:00:00', 'openssl day3'))
+    assert indexed(conn, 'a') == ['2024-01-03T00:00:00', '2024-01-04T00:00:00']
+
+    assert search(conn, 'day1 OR late OR day2') == []
+    assert_index_in_sync(conn)
+
+
+def test_trimming_is_per_machine():
+    conn = make_db()
+    ingest(conn, report('a', '2024-01-01T00:00:00', 'openssl'))
+    for day in (2, 3, 4):
+        ingest(conn, report('b', f'2024-01-0{day}T00:00:00', 'openssl'))
+    assert indexed(conn, 'a') == ['2024-01-01T00:00:00']
+    assert len(indexed(conn, 'b')) == 2
+    assert_index_in_sync(conn)
+
+
+def test_search_limit_and_check_filter():
+    conn = make_db()
+    for i in range(5):
+        ingest(conn, report(f'm{i}', '2024-01-01T00:00:00', 'Inst openssl [3.0.2]', antivirus='openssl scan'))
+
+    results = search(conn, 'openssl', limit=3)
+    assert len(results) == 3
+    assert {match['check'] for match in results[0]['matches']} == {'os_updates', 'antivirus'}
+
+    results = search(conn, 'openssl', check='antivirus')
+    assert len(results) == 5
+    for result in results:
+        assert [match['check'] for match in result['matches']] == ['antivirus']
+        assert '[openssl]' in result['matches'][0]['snippet']
+
+    assert search(conn, 'openssl', check='sleep_settings') == []
+
+
+def test_rebuild_matches_ingest():
+    conn = make_db()
+    for machine_id in ('a', 'b'):
+        for day in (1, 2, 3):
+            ingest(conn, report(machine_id, f'2024-01-0{day}T00:00:00', f'openssl day{day}'))
+    expected = search(conn, 'openssl')
+
+    conn.execute('DELETE FROM check_details')
+    assert search(conn, 'openssl') == []
+    assert rebuild(conn, keep=2) == 4
+    assert search(conn, 'openssl') == expected
+    assert indexed(conn, 'a') == ['2024-01-02T00:00:00', '2024-01-03T00:00:00']
+    assert_index_in_sync(conn)
+
+
+@pytest.mark.parametrize('query', ['"unterminated', 'AND', 'openssl AND', 'details:'])
+def test_malformed_query_raises_operational_error(query):
+    conn = make_db()
+    ingest(conn, report('a', '2024-01-01T00:00:00', 'openssl'))
+    with pytest.raises(sqlite3.OperationalError):
+        search(conn, query)
+
+
+@pytest.mark.parametrize('query', ['"unterminated', 'AND'])
+def test_search_endpoint_rejects_malformed_query(tmp_path, monkeypatch, query):
+    server = pytest.importorskip('server')
+    monkeypatch.setattr(server, 'DB_PATH', str(tmp_path / 'system_data.db'))
+    server.init_db()
+    response = server.app.test_client().get(
+        '/search', query_string={'q': query}, headers={'X-API-Key': server.os.getenv('API_KEY')}
+    )
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid search query'}
@@ -1,3 +1,4 @@
+import math
 import os
 from dotenv import load_dotenv
 import logging
@@ -9,6 +10,17 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+def env_number(name: str, default: float, minimum: float = 0.0, maximum: float = math.inf) -> float:
+    """Numeric setting from the environment; falls back to the default on bad values."""
+    try:
+        value = float(os.getenv(name, default))
+        if not math.isfinite(value):
+            raise ValueError(name)
+        return max(minimum, min(maximum, value))
+    except ValueError:
+        logging.warning(f"Invalid {name}={os.getenv(name)!r}, using {default}")
+        return default
+
 class Config:
     def __init__(self):
         # Load environment variables from .env file if it exists
@@ -20,13 +32,20 @@ class Config:
         
         # Check interval in seconds (15-60 minutes)
         default_interval = 900  # 15 minutes
+        self.min_check_interval = 900
+        self.max_check_interval = 3600
         try:
             interval = int(os.getenv('CHECK_INTERVAL', default_interval))
             # Ensure interval is between 15 and 60 minutes
-            self.check_interval = max(900, min(3600, interval))
+            self.check_interval = max(self.min_check_interval, min(self.max_check_interval, interval))
         except ValueError:
             self.check_interval = default_interval
         
+        # Optional cycle profiling: fraction of cycles to keep and slow-cycle threshold (seconds)
+        self.profile_sample_rate = env_number('PROFILE_SAMPLE_RATE', 0.0, maximum=1.0)
+        self.profile_slow_seconds = env_number('PROFILE_SLOW_SECONDS', 0.0)
+        self.profile_dir = os.getenv('PROFILE_DIR', 'profiles')
+        
         # Set environment variables
         os.environ['API_KEY'] = self.api_key
         os.environ['API_URL'] = self.api_url
@@ -39,6 +58,7 @@ class Config:
         if self.api_key:
             logging.debug(f"API Key length: {len(self.api_key)}")
         logging.debug(f"Check Interval: {self.check_interval} seconds ({self.check_interval/60:.1f} minutes)")
+        logging.debug(f"Profiling: sample rate {self.profile_sample_rate}, slow threshold {self.profile_slow_seconds}s")
         
         # Debug print statements
         print("DEBUG: self.api_key =", repr(self.api_key))
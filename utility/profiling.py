@@ -0,0 +1,59 @@
+import cProfile
+import logging
+import os
+import random
+import time
+from datetime import datetime
+from typing import Any, Callable
+
+
+class CycleProfiler:
+    """Opt-in cProfile capture of check cycles.
+
+    A cycle is kept when randomly selected (``sample_rate``) or when it takes
+    longer than ``slow_seconds``. Kept profiles are written as ``.prof`` files
+    (readable with ``python -m pstats``) and only the newest ``max_files`` are
+    retained.
+    """
+
+    def __init__(self, directory: str, sample_rate: float = 0.0, slow_seconds: float = 0.0,
+                 max_files: int = 20):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.max_files = max(1, max_files)
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 or self.slow_seconds > 0
+
+    def run(self, func: Callable[[], Any]) -> Any:
+        """Call ``func``, profiling it when enabled."""
+        if not self.enabled:
+            return func()
+
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            return profile.runcall(func)
+        finally:
+            duration = time.perf_counter() - started
+            if self.slow_seconds > 0 and duration >= self.slow_seconds:
+                self._save(profile, duration, 'slow')
+            elif random.random() < self.sample_rate:
+                self._save(profile, duration, 'sampled')
+
+    def _save(self, profile: cProfile.Profile, duration: float, reason: str):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            name = f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{reason}-{duration * 1000:.0f}ms.prof"
+            path = os.path.join(self.directory, name)
+            profile.dump_stats(path)
+            logging.info(f"Saved {reason} cycle profile ({duration:.1f}s) to {path}")
+
+            # Keep only the newest profiles
+            files = sorted(f for f in os.listdir(self.directory) if f.endswith('.prof'))
+            for old in files[:max(0, len(files) - self.max_files)]:
+                os.remove(os.path.join(self.directory, old))
+        except OSError as e:
+            logging.error(f"Error saving cycle profile: {str(e)}")
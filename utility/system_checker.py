@@ -3,12 +3,14 @@ import psutil
 import os
 import time
 import json
+import random
 import requests
 import subprocess
 from datetime import datetime
 import logging
 from typing import Dict, Any
 from config import Config
+from profiling import CycleProfiler
 
 # Configure logging
 logging.basicConfig(
@@ -29,6 +31,12 @@ class SystemChecker:
         self.machine_id = self._get_machine_id()
         self.last_check = None
         self.last_data = None
+        self.schedule_hint = None
+        self.profiler = CycleProfiler(
+            self.config.profile_dir,
+            sample_rate=self.config.profile_sample_rate,
+            slow_seconds=self.config.profile_slow_seconds
+        )
         self.resource_usage = {
             'cpu_percent': 0,
             'memory_percent': 0,
@@ -261,13 +269,18 @@ class SystemChecker:
                     json=data,
                     headers={
                         "X-API-Key": self.api_key,
-                        "Content-Type": "application/json"
+                        "Content-Type": "application/json",
+                        "X-Report-Interval": str(self.check_interval)
                     },
                     timeout=10
                 )
                 
                 if response.status_code == 200:
                     logging.info("Data sent successfully")
+                    try:
+                        self.schedule_hint = response.json().get('schedule')
+                    except ValueError:
+                        self.schedule_hint = None
                     return True
                 else:
                     logging.error(f"Server returned status code {response.status_code}: {response.text}")
@@ -281,6 +294,21 @@ class SystemChecker:
         logging.error("Failed to send system data")
         return False
 
+    def _next_sleep(self) -> float:
+        """Seconds until the next report, following server hints within configured bounds."""
+        hint = self.schedule_hint
+        self.schedule_hint = None
+        if not hint or 'next_report_in' not in hint:
+            return self.check_interval
+        try:
+            delay = float(hint['next_report_in']) + random.uniform(0, float(hint.get('jitter', 0)))
+        except (TypeError, ValueError):
+            logging.warning(f"Ignoring invalid schedule hint: {hint}")
+            return self.check_interval
+        delay = max(self.config.min_check_interval, min(self.config.max_check_interval, delay))
+        logging.debug(f"Next report in {delay:.0f} seconds (server hint)")
+        return delay
+
     def run(self):
         """Main loop with server availability check."""
         if not self.wait_for_server():
@@ -289,10 +317,10 @@ class SystemChecker:
 
         while True:
             try:
-                data = self.get_system_info()
+                data = self.profiler.run(self.get_system_info)
                 if data:
                     self.send_data(data)
-                time.sleep(self.check_interval)
+                time.sleep(self._next_sleep())
             except KeyboardInterrupt:
                 logging.info("System checker stopped by user")
                 break